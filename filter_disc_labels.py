@@ -2,19 +2,30 @@ import argparse
 import numpy as np
 import nibabel as nib
 
+from seg_kernels import count_labels
+
 
 def filter_disc_labels(input_path, output_path, max_label=21):
     """Remove disc labels outside PAM50 template range (keep 1-max_label and 60)."""
     img = nib.load(input_path)
-    data = np.round(img.get_fdata()).astype(np.int16)
+    # Read the stored array via dataobj; float-stored labels are rounded in place,
+    # so there is no float64 intermediate
+    data = np.asanyarray(img.dataobj)
+    if not np.issubdtype(data.dtype, np.integer):
+        np.rint(data, out=data)
+    data = data.astype(np.int16, copy=False)
 
     valid = set(range(1, max_label + 1)) | {60}
-    removed = set(np.unique(data)) - valid - {0}
+    labels, _ = count_labels(data)
+    removed = set(labels.tolist()) - valid - {0}
 
     if removed:
         print(f"Removing out-of-range disc labels: {sorted(removed)}")
-        for label in removed:
-            data[data == label] = 0
+        # Single pass through a boolean lookup table instead of one scan per label.
+        # mode="clip" sends negative values to index 0, which is not kept.
+        keep = np.zeros(max(int(labels.max()), max_label, 60) + 1, dtype=bool)
+        keep[sorted(valid)] = True
+        data *= np.take(keep, data, mode="clip")
 
     out_img = nib.Nifti1Image(data, img.affine, img.header)
     nib.save(out_img, output_path)
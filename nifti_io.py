@@ -0,0 +1,33 @@
+"""NIfTI output helpers for the label-processing scripts."""
+import shutil
+import subprocess
+
+import nibabel as nib
+
+
+def nifti_output_path(output_path, compress=False):
+    """Return the path save_nifti will write for output_path.
+
+    Uncompressed output drops the ``.gz`` suffix, so ``x.nii.gz`` becomes ``x.nii``.
+    """
+    if not compress and output_path.endswith(".nii.gz"):
+        return output_path[:-len(".gz")]
+    return output_path
+
+
+def save_nifti(img, output_path, compress=False):
+    """Save img and return the path written.
+
+    nibabel's gzip writer is single-threaded and dominates the write time of whole-volume
+    masks, so by default the image is written uncompressed. With compress, the image is
+    written as ``.nii`` and then gzipped by multithreaded pigz when it is installed;
+    otherwise nibabel compresses it.
+    """
+    output_path = nifti_output_path(output_path, compress)
+    if compress and output_path.endswith(".nii.gz") and shutil.which("pigz"):
+        uncompressed_path = output_path[:-len(".gz")]
+        nib.save(img, uncompressed_path)
+        subprocess.run(["pigz", "-f", "-p", "4", uncompressed_path], check=True)
+    else:
+        nib.save(img, output_path)
+    return output_path
@@ -1,72 +1,95 @@
 import argparse
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import pandas as pd
 
+_SUB_RE = re.compile(r"sub-([A-Za-z0-9]+)")
+_SES_RE = re.compile(r"ses-([A-Za-z0-9]+)")
+
+# Below this many files, pickling each path and row through a worker costs more than it saves
+_MIN_PARALLEL_FILES = 256
+
 
 def extract_bids_fields(filename):
     """Extract subject and session from a BIDS-style filename."""
-    sub_match = re.search(r"sub-([A-Za-z0-9]+)", filename)
-    ses_match = re.search(r"ses-([A-Za-z0-9]+)", filename)
+    sub_match = _SUB_RE.search(filename)
+    ses_match = _SES_RE.search(filename)
     subject_id = sub_match.group(1) if sub_match else ""
     session_id = ses_match.group(1) if ses_match else ""
     return subject_id, session_id
 
 
-def parse_method_directory(method_dir, info_column, measure_type):
+def _parse_one_csv(filepath, info_column):
+    """Read one per-subject CSV and pivot its levels into a single row dict.
+
+    Returns None if the file cannot be read or lacks info_column.
+    """
+    subject_id, session_id = extract_bids_fields(os.path.basename(filepath))
+
+    try:
+        df = pd.read_csv(filepath)
+    except Exception as e:
+        print(f"WARNING: Could not read {filepath}: {e}")
+        return None
+
+    if info_column not in df.columns:
+        print(f"WARNING: Column '{info_column}' not found in {filepath}. "
+              f"Available: {list(df.columns)}")
+        return None
+
+    # Pivot levels into columns
+    row = {"subject_id": subject_id, "session_id": session_id}
+    level_col = "VertLevel" if "VertLevel" in df.columns else "vertLevel"
+    if level_col in df.columns:
+        levels = df[level_col].to_numpy(dtype=int)
+        values = df[info_column].to_numpy()
+        row.update({f"level{lev}": val for lev, val in zip(levels, values) if lev > 0})
+    return row
+
+
+def parse_method_directory(method_dir, info_column, measure_type, executor=None, n_workers=1):
     """Parse all CSVs in a method directory for a given measure type (cord/canal/ratio).
 
+    If a process pool executor with n_workers is given and there are enough files, they
+    are parsed in parallel in chunks; otherwise they are parsed serially.
+
     Returns a DataFrame with columns:
         subject_id, session_id, level2, level3, level4
     """
-    rows = []
     pattern = f"_{measure_type}.csv"
 
     if not os.path.isdir(method_dir):
         print(f"WARNING: Directory not found: {method_dir}")
         return pd.DataFrame()
 
-    for fname in sorted(os.listdir(method_dir)):
-        if not fname.endswith(pattern):
-            continue
-
-        filepath = os.path.join(method_dir, fname)
-        subject_id, session_id = extract_bids_fields(fname)
-
-        try:
-            df = pd.read_csv(filepath)
-        except Exception as e:
-            print(f"WARNING: Could not read {filepath}: {e}")
-            continue
-
-        if info_column not in df.columns:
-            print(f"WARNING: Column '{info_column}' not found in {filepath}. "
-                  f"Available: {list(df.columns)}")
-            continue
-
-        # Pivot levels into columns
-        row = {"subject_id": subject_id, "session_id": session_id}
-        for _, record in df.iterrows():
-            level = int(record.get("VertLevel", record.get("vertLevel", -1)))
-            if level > 0:
-                row[f"level{level}"] = record[info_column]
+    # DirEntry caches the file type from the directory read, so no extra stat per file
+    with os.scandir(method_dir) as it:
+        filepaths = sorted(
+            entry.path for entry in it
+            if entry.is_file() and entry.name.endswith(pattern)
+        )
+    if not filepaths:
+        return pd.DataFrame()
 
-        rows.append(row)
+    if executor is None or n_workers < 2 or len(filepaths) < _MIN_PARALLEL_FILES:
+        parsed = map(_parse_one_csv, filepaths, repeat(info_column))
+    else:
+        # Batch files per task so each IPC round trip covers many small CSVs
+        chunksize = max(1, len(filepaths) // (4 * n_workers))
+        parsed = executor.map(_parse_one_csv, filepaths, repeat(info_column),
+                              chunksize=chunksize)
+    rows = [row for row in parsed if row is not None]
 
     if not rows:
         return pd.DataFrame()
 
-    result = pd.DataFrame(rows)
-    # Dynamically discover all level columns and sort numerically
-    level_cols = sorted(
-        [c for c in result.columns if c.startswith("level")],
-        key=lambda x: int(x.replace("level", ""))
-    )
-    cols = ["subject_id", "session_id"] + level_cols
-    for c in cols:
-        if c not in result.columns:
-            result[c] = ""
-    return result[cols]
+    # Dynamically discover all level columns and sort numerically; passing the
+    # full column list lets pandas skip per-row schema inference
+    levels = sorted({int(k[len("level"):]) for row in rows for k in row if k.startswith("level")})
+    cols = ["subject_id", "session_id"] + [f"level{lev}" for lev in levels]
+    return pd.DataFrame.from_records(rows, columns=cols)
 
 
 def main():
@@ -95,28 +118,42 @@ def main():
     os.makedirs(output_dir, exist_ok=True)
 
     # Discover method directories
-    method_dirs = sorted([
-        d for d in os.listdir(results_dir)
-        if os.path.isdir(os.path.join(results_dir, d)) and d.startswith("method-")
-    ])
+    with os.scandir(results_dir) as it:
+        method_dirs = sorted(
+            entry.name for entry in it
+            if entry.is_dir() and entry.name.startswith("method-")
+        )
 
     if not method_dirs:
         print(f"No method-* directories found in {results_dir}")
         return
 
-    for method in method_dirs:
-        method_path = os.path.join(results_dir, method)
-        print(f"\nProcessing: {method}")
-
-        for measure_type in ("cord", "canal", "ratio"):
-            col = "aSCOR" if measure_type == "ratio" else info_column
-            df = parse_method_directory(method_path, col, measure_type)
-            if df.empty:
-                continue
-
-            out_file = os.path.join(output_dir, f"{method}_{measure_type}.csv")
-            df.to_csv(out_file, index=False)
-            print(f"  {measure_type}: {len(df)} subjects -> {out_file}")
+    # One pool shared by every (method, measure) directory parse; none on a single CPU.
+    # Size it by the CPUs this process may actually use (cgroup/affinity-limited nodes).
+    try:
+        n_workers = len(os.sched_getaffinity(0))
+    except AttributeError:  # sched_getaffinity is not available on every platform
+        n_workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(n_workers) if n_workers > 1 else None
+
+    try:
+        for method in method_dirs:
+            method_path = os.path.join(results_dir, method)
+            print(f"\nProcessing: {method}")
+
+            for measure_type in ("cord", "canal", "ratio"):
+                col = "aSCOR" if measure_type == "ratio" else info_column
+                df = parse_method_directory(method_path, col, measure_type,
+                                            executor=executor, n_workers=n_workers)
+                if df.empty:
+                    continue
+
+                out_file = os.path.join(output_dir, f"{method}_{measure_type}.csv")
+                df.to_csv(out_file, index=False)
+                print(f"  {measure_type}: {len(df)} subjects -> {out_file}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
 
 if __name__ == "__main__":
@@ -34,6 +34,8 @@ trap "echo Caught Keyboard Interrupt within script. Exiting now.; exit" INT
 
 # ITK thread control — prevent oversubscription when sct_run_batch uses -jobs N
 export ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS="${ITK_THREADS:-4}"
+# Same for the numba kernels in the label-processing scripts (run concurrently per subject)
+export NUMBA_NUM_THREADS="${NUMBA_THREADS:-2}"
 
 # Retrieve input params
 SUBJECT=$1
@@ -117,14 +119,14 @@ file_tss_vert="${file_base}_seg-totalspineseg-vertlevels"
 
 python3 "${SCRIPT_DIR}/process_seg.py" \
     -i "${file_totalseg_all}.nii.gz" \
-    --cord "${file_tss_cord}.nii.gz" \
-    --canal "${file_tss_canal}.nii.gz" \
-    --combined "${file_tss_union}.nii.gz" &
+    --cord "${file_tss_cord}.nii" \
+    --canal "${file_tss_canal}.nii" \
+    --combined "${file_tss_union}.nii" &
 pid_seg=$!
 
 python3 "${SCRIPT_DIR}/relabel_vertebrae.py" \
     --mask "${file_totalseg_all}.nii.gz" \
-    --out "${file_tss_vert}.nii.gz" &
+    --out "${file_tss_vert}.nii" &
 pid_vert=$!
 
 wait $pid_seg
@@ -138,18 +140,18 @@ wait $pid_vert
 (
     mkdir -p "${PATH_RESULTS}/method-totalspineseg"
 
-    sct_process_segmentation -i "${file_tss_cord}.nii.gz" \
-        -vertfile "${file_tss_vert}.nii.gz" \
+    sct_process_segmentation -i "${file_tss_cord}.nii" \
+        -vertfile "${file_tss_vert}.nii" \
         -o "${PATH_RESULTS}/method-totalspineseg/${file}_cord.csv" -vert 1:25 -perlevel 1 &
     pid1=$!
 
-    sct_process_segmentation -i "${file_tss_union}.nii.gz" \
-        -vertfile "${file_tss_vert}.nii.gz" \
+    sct_process_segmentation -i "${file_tss_union}.nii" \
+        -vertfile "${file_tss_vert}.nii" \
         -o "${PATH_RESULTS}/method-totalspineseg/${file}_canal.csv" -vert 1:25 -perlevel 1 &
     pid2=$!
 
-    sct_process_segmentation -i "${file_tss_canal}.nii.gz" \
-        -vertfile "${file_tss_vert}.nii.gz" \
+    sct_process_segmentation -i "${file_tss_canal}.nii" \
+        -vertfile "${file_tss_vert}.nii" \
         -o "${file_tss_canal}_csa.csv" -vert 1:25 -perlevel 1 &
     pid3=$!
 
@@ -173,7 +175,7 @@ pid_branch_a=$!
         -o "${file_discs_filtered}.nii.gz"
 
     sct_register_to_template -i "${file_base}.nii.gz" \
-        -s "${file_tss_cord}.nii.gz" \
+        -s "${file_tss_cord}.nii" \
         -ldisc "${file_discs_filtered}.nii.gz" \
         -c "$REG_CONTRAST" -qc "${PATH_QC}"
 
@@ -227,7 +229,7 @@ pid_branch_a=$!
 
             # Post-process canal mask: union with cord + fill holes
             sct_maths -i "PAM50_canal_warped_${INTERP}_bin.nii.gz" \
-                -add "${file_tss_cord}.nii.gz" \
+                -add "${file_tss_cord}.nii" \
                 -o "PAM50_canal_warped_${INTERP}_bin.nii.gz"
             sct_maths -i "PAM50_canal_warped_${INTERP}_bin.nii.gz" -bin 0.5 \
                 -o "PAM50_canal_warped_${INTERP}_bin.nii.gz"
@@ -246,14 +248,14 @@ pid_branch_a=$!
                     -o "${PATH_RESULTS}/method-atlas41-warp-${INTERP}/${file}_canal.csv" -vert 1:25 -perlevel 1 &
                 pid_c1=$!
 
-                sct_process_segmentation -i "${file_tss_cord}.nii.gz" \
+                sct_process_segmentation -i "${file_tss_cord}.nii" \
                     -vertfile PAM50_levels_warped_nn.nii.gz \
                     -o "${PATH_RESULTS}/method-atlas41-warp-${INTERP}/${file}_cord.csv" -vert 1:25 -perlevel 1 &
                 pid_c2=$!
 
                 {
                     sct_maths -i "PAM50_atlas41_warped_${INTERP}_bin.nii.gz" \
-                        -sub "${file_tss_cord}.nii.gz" \
+                        -sub "${file_tss_cord}.nii" \
                         -o "PAM50_atlas41_canal_only_${INTERP}.nii.gz"
                     sct_maths -i "PAM50_atlas41_canal_only_${INTERP}.nii.gz" -bin 0.5 \
                         -o "PAM50_atlas41_canal_only_${INTERP}_bin.nii.gz"
@@ -280,14 +282,14 @@ pid_branch_a=$!
                     -o "${PATH_RESULTS}/method-pam50-warp-${INTERP}/${file}_canal.csv" -vert 1:25 -perlevel 1 &
                 pid_c1=$!
 
-                sct_process_segmentation -i "${file_tss_cord}.nii.gz" \
+                sct_process_segmentation -i "${file_tss_cord}.nii" \
                     -vertfile PAM50_levels_warped_nn.nii.gz \
                     -o "${PATH_RESULTS}/method-pam50-warp-${INTERP}/${file}_cord.csv" -vert 1:25 -perlevel 1 &
                 pid_c2=$!
 
                 {
                     sct_maths -i "PAM50_canal_warped_${INTERP}_bin.nii.gz" \
-                        -sub "${file_tss_cord}.nii.gz" \
+                        -sub "${file_tss_cord}.nii" \
                         -o "PAM50_canal_only_warped_${INTERP}.nii.gz"
                     sct_maths -i "PAM50_canal_only_warped_${INTERP}.nii.gz" -bin 0.5 \
                         -o "PAM50_canal_only_warped_${INTERP}_bin.nii.gz"
@@ -334,24 +336,24 @@ if [[ "$CONTRAST" == "t2w" ]]; then
 
             python3 "${SCRIPT_DIR}/process_spineps_seg.py" \
                 -i "${file_spineps_spine}.nii.gz" \
-                --cord "${file_spi_cord}.nii.gz" \
-                --canal "${file_spi_canal}.nii.gz" \
-                --combined "${file_spi_union}.nii.gz"
+                --cord "${file_spi_cord}.nii" \
+                --canal "${file_spi_canal}.nii" \
+                --combined "${file_spi_union}.nii"
 
             mkdir -p "${PATH_RESULTS}/method-spineps"
 
-            sct_process_segmentation -i "${file_spi_cord}.nii.gz" \
-                -vertfile "${file_tss_vert}.nii.gz" \
+            sct_process_segmentation -i "${file_spi_cord}.nii" \
+                -vertfile "${file_tss_vert}.nii" \
                 -o "${PATH_RESULTS}/method-spineps/${file}_cord.csv" -vert 1:25 -perlevel 1 &
             pid_s1=$!
 
-            sct_process_segmentation -i "${file_spi_union}.nii.gz" \
-                -vertfile "${file_tss_vert}.nii.gz" \
+            sct_process_segmentation -i "${file_spi_union}.nii" \
+                -vertfile "${file_tss_vert}.nii" \
                 -o "${PATH_RESULTS}/method-spineps/${file}_canal.csv" -vert 1:25 -perlevel 1 &
             pid_s2=$!
 
-            sct_process_segmentation -i "${file_spi_canal}.nii.gz" \
-                -vertfile "${file_tss_vert}.nii.gz" \
+            sct_process_segmentation -i "${file_spi_canal}.nii" \
+                -vertfile "${file_tss_vert}.nii" \
                 -o "${file_spi_canal}_csa.csv" -vert 1:25 -perlevel 1 &
             pid_s3=$!
 
@@ -384,18 +386,18 @@ mkdir -p "${PATH_QC}/custom_overlays"
 
 # Build SPINEPS args if available (T2w only)
 SPINEPS_QC_ARGS=""
-if [[ "$CONTRAST" == "t2w" && -f "${file_base}_seg-spineps-cord.nii.gz" ]]; then
-    SPINEPS_QC_ARGS="--spineps-cord ${file_base}_seg-spineps-cord.nii.gz --spineps-canal ${file_base}_seg-spineps-cord-canal-union.nii.gz"
+if [[ "$CONTRAST" == "t2w" && -f "${file_base}_seg-spineps-cord.nii" ]]; then
+    SPINEPS_QC_ARGS="--spineps-cord ${file_base}_seg-spineps-cord.nii --spineps-canal ${file_base}_seg-spineps-cord-canal-union.nii"
 fi
 
 python3 "${SCRIPT_DIR}/generate_qc.py" \
     -i "${file_base}.nii.gz" \
-    --vertfile "${file_tss_vert}.nii.gz" \
-    --totalspineseg-cord "${file_tss_cord}.nii.gz" \
-    --totalspineseg-canal "${file_tss_union}.nii.gz" \
-    --custom-atlas-cord "${file_tss_cord}.nii.gz" \
+    --vertfile "${file_tss_vert}.nii" \
+    --totalspineseg-cord "${file_tss_cord}.nii" \
+    --totalspineseg-canal "${file_tss_union}.nii" \
+    --custom-atlas-cord "${file_tss_cord}.nii" \
     --custom-atlas-canal "PAM50_atlas41_warped_spline_bin.nii.gz" \
-    --pam50-cord "${file_tss_cord}.nii.gz" \
+    --pam50-cord "${file_tss_cord}.nii" \
     --pam50-canal "PAM50_canal_warped_spline_bin.nii.gz" \
     ${SPINEPS_QC_ARGS} \
     -o "${PATH_QC}/custom_overlays/${file}_qc.png" \
@@ -3,27 +3,39 @@ import sys
 import numpy as np
 import nibabel as nib
 
-def process_segmentation(input_file, cord_out=None, canal_out=None, combined_out=None):
+from nifti_io import nifti_output_path, save_nifti
+from seg_kernels import count_labels, split_and_intersect
+
+def process_segmentation(input_file, cord_out=None, canal_out=None, combined_out=None,
+                         compress=False):
     print(f"Loading: {input_file}")
     
     try:
         # 1. Load the NIfTI file
         img = nib.load(input_file)
-        data = img.get_fdata()
+        raw = np.asanyarray(img.dataobj)
         header = img.header.copy()
         affine = img.affine
 
         # 2. Round data to handle potential float issues (e.g. 1.0001 -> 1)
-        data_int = np.round(data).astype(np.int16)
+        # Integer-stored labels are cast directly, without a float64 round-trip
+        if not np.issubdtype(raw.dtype, np.integer):
+            raw = np.rint(raw)
+        data_int = raw.astype(np.int16, copy=False)
         
         # Check what labels are actually in the file
-        unique_labels = np.unique(data_int)
-        print(f"Labels found in input: {unique_labels}")
+        unique_labels, label_counts = count_labels(data_int)
+        print(f"Labels found in input: {unique_labels} (voxels: {label_counts})")
 
         # Warn if expected labels (1 or 2) are missing but 50/51 (SCT standard) exist
         if (1 not in unique_labels) and (50 in unique_labels):
             print("WARNING: Label 1 not found, but 50 found. Did you mean to use the SCT default (50=Cord)?")
 
+        # Extract both binary masks and their per-slice presence in one pass.
+        # When both labels exist, the masks are already restricted to the shared Z-range.
+        cord_mask, canal_mask, slices_with_cord, slices_with_canal = split_and_intersect(
+            data_int, 1, 2)
+
         # ---------------------------------------------------------
         # NEW LOGIC: Intersection of Z-Range
         # ---------------------------------------------------------
@@ -31,11 +43,6 @@ def process_segmentation(input_file, cord_out=None, canal_out=None, combined_out
         if 1 in unique_labels and 2 in unique_labels:
             print("Ensuring Cord and Canal occupy the same Z-range...")
 
-            # Assume 3D volume (X, Y, Z). Check for presence in Z slices.
-            # axis=(0, 1) collapses the axial slice to a single boolean (True if label exists in that slice)
-            slices_with_cord = np.any(data_int == 1, axis=(0, 1))
-            slices_with_canal = np.any(data_int == 2, axis=(0, 1))
-
             # Find the intersection: Slices where BOTH are defined
             valid_z_slices = slices_with_cord & slices_with_canal
             
@@ -50,10 +57,6 @@ def process_segmentation(input_file, cord_out=None, canal_out=None, combined_out
             if n_shared == 0:
                 print("WARNING: Cord and Canal share NO Z-slices! All outputs will be empty.")
 
-            # Zero out any data in slices that are NOT in the valid set
-            # ~valid_z_slices gives the indices of slices to remove
-            data_int[:, :, ~valid_z_slices] = 0
-            
         else:
             print("Note: Input does not contain both Label 1 and Label 2. Skipping Z-range intersection.")
         # ---------------------------------------------------------
@@ -65,31 +68,31 @@ def process_segmentation(input_file, cord_out=None, canal_out=None, combined_out
             
             # Binarize: ensure anything selected is 1, background is 0
             binary_data = (mask_data > 0).astype(np.int16)
+            n_voxels = np.count_nonzero(binary_data)
             
-            if np.sum(binary_data) == 0:
+            if n_voxels == 0:
                 print(f"WARNING: Output mask for {desc} is empty!")
             else:
-                print(f"Saving {desc}: {output_filename} (voxels: {np.sum(binary_data)})")
+                print(f"Saving {desc}: {nifti_output_path(output_filename, compress)} "
+                      f"(voxels: {n_voxels})")
 
             # Update header for integer type to save space
             header.set_data_dtype(np.int16)
             new_img = nib.Nifti1Image(binary_data, affine, header)
-            nib.save(new_img, output_filename)
+            save_nifti(new_img, output_filename, compress)
 
         # 3. Process Cord (Label 1)
         if cord_out:
-            mask = (data_int == 1)
-            save_mask(mask, cord_out, "Cord (Label 1)")
+            save_mask(cord_mask, cord_out, "Cord (Label 1)")
 
         # 4. Process Canal (Label 2)
         if canal_out:
-            mask = (data_int == 2)
-            save_mask(mask, canal_out, "Canal (Label 2)")
+            save_mask(canal_mask, canal_out, "Canal (Label 2)")
 
         # 5. Process Combined (Label 1 + 2)
         if combined_out:
             # Select where label is 1 OR 2
-            mask = np.isin(data_int, [1, 2])
+            mask = cord_mask | canal_mask
             save_mask(mask, combined_out, "Cord+Canal (Labels 1+2)")
 
     except Exception as e:
@@ -106,9 +109,15 @@ if __name__ == "__main__":
     parser.add_argument("-i", "--segmentation", required=True, help="Input multi-label segmentation file.")
     
     # Output files (optional - only generate what is requested)
-    parser.add_argument("--cord", help="Output filename for Cord mask (Label 1)")
-    parser.add_argument("--canal", help="Output filename for Canal mask (Label 2)")
-    parser.add_argument("--combined", help="Output filename for Combined mask (Labels 1+2)")
+    parser.add_argument("--cord", help="Output filename for Cord mask (Label 1)"
+                        " (a .nii.gz path is written as .nii unless --compress is given)")
+    parser.add_argument("--canal", help="Output filename for Canal mask (Label 2)"
+                        " (a .nii.gz path is written as .nii unless --compress is given)")
+    parser.add_argument("--combined", help="Output filename for Combined mask (Labels 1+2)"
+                        " (a .nii.gz path is written as .nii unless --compress is given)")
+    parser.add_argument("--compress", action="store_true",
+                        help="Gzip the outputs (with pigz when installed). Without it, a .nii.gz "
+                             "output path is written uncompressed with the .gz dropped")
 
     args = parser.parse_args()
 
@@ -116,5 +125,6 @@ if __name__ == "__main__":
         args.segmentation, 
         cord_out=args.cord, 
         canal_out=args.canal, 
-        combined_out=args.combined
+        combined_out=args.combined,
+        compress=args.compress,
     )
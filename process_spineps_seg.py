@@ -3,8 +3,12 @@ import sys
 import numpy as np
 import nibabel as nib
 
+from nifti_io import nifti_output_path, save_nifti
+from seg_kernels import count_labels, split_and_intersect
 
-def process_spineps_segmentation(input_file, cord_out=None, canal_out=None, combined_out=None):
+
+def process_spineps_segmentation(input_file, cord_out=None, canal_out=None, combined_out=None,
+                                 compress=False):
     """Parse SPINEPS semantic segmentation into binary masks.
 
     SPINEPS labels:
@@ -15,14 +19,16 @@ def process_spineps_segmentation(input_file, cord_out=None, canal_out=None, comb
 
     try:
         img = nib.load(input_file)
-        data = img.get_fdata()
+        raw = np.asanyarray(img.dataobj)
         header = img.header.copy()
         affine = img.affine
 
-        data_int = np.round(data).astype(np.int16)
+        if not np.issubdtype(raw.dtype, np.integer):
+            raw = np.rint(raw)
+        data_int = raw.astype(np.int16, copy=False)
 
-        unique_labels = np.unique(data_int)
-        print(f"Labels found in input: {unique_labels}")
+        unique_labels, label_counts = count_labels(data_int)
+        print(f"Labels found in input: {unique_labels} (voxels: {label_counts})")
 
         # Validate expected SPINEPS labels
         if 60 not in unique_labels:
@@ -30,13 +36,15 @@ def process_spineps_segmentation(input_file, cord_out=None, canal_out=None, comb
         if 61 not in unique_labels:
             print("WARNING: Label 61 (spinal canal) not found in SPINEPS segmentation.")
 
-        # Z-range intersection: restrict to slices where both cord and canal exist
+        # Extract both binary masks and their per-slice presence in one pass.
+        # Z-range intersection: when both labels exist, the masks are restricted to
+        # slices where both cord and canal exist
+        cord_mask, canal_mask, slices_with_cord, slices_with_canal = split_and_intersect(
+            data_int, 60, 61)
+
         if 60 in unique_labels and 61 in unique_labels:
             print("Ensuring Cord and Canal occupy the same Z-range...")
 
-            slices_with_cord = np.any(data_int == 60, axis=(0, 1))
-            slices_with_canal = np.any(data_int == 61, axis=(0, 1))
-
             valid_z_slices = slices_with_cord & slices_with_canal
 
             n_cord = np.sum(slices_with_cord)
@@ -49,8 +57,6 @@ def process_spineps_segmentation(input_file, cord_out=None, canal_out=None, comb
 
             if n_shared == 0:
                 print("WARNING: Cord and Canal share NO Z-slices! All outputs will be empty.")
-
-            data_int[:, :, ~valid_z_slices] = 0
         else:
             print("Note: Input does not contain both Label 60 and Label 61. Skipping Z-range intersection.")
 
@@ -58,27 +64,27 @@ def process_spineps_segmentation(input_file, cord_out=None, canal_out=None, comb
             if output_filename is None:
                 return
             binary_data = (mask_data > 0).astype(np.int16)
-            if np.sum(binary_data) == 0:
+            n_voxels = np.count_nonzero(binary_data)
+            if n_voxels == 0:
                 print(f"WARNING: Output mask for {desc} is empty!")
             else:
-                print(f"Saving {desc}: {output_filename} (voxels: {np.sum(binary_data)})")
+                print(f"Saving {desc}: {nifti_output_path(output_filename, compress)} "
+                      f"(voxels: {n_voxels})")
             header.set_data_dtype(np.int16)
             new_img = nib.Nifti1Image(binary_data, affine, header)
-            nib.save(new_img, output_filename)
+            save_nifti(new_img, output_filename, compress)
 
         # Cord (Label 60)
         if cord_out:
-            mask = (data_int == 60)
-            save_mask(mask, cord_out, "Cord (Label 60)")
+            save_mask(cord_mask, cord_out, "Cord (Label 60)")
 
         # Canal (Label 61)
         if canal_out:
-            mask = (data_int == 61)
-            save_mask(mask, canal_out, "Canal (Label 61)")
+            save_mask(canal_mask, canal_out, "Canal (Label 61)")
 
         # Combined (Labels 60 + 61)
         if combined_out:
-            mask = np.isin(data_int, [60, 61])
+            mask = cord_mask | canal_mask
             save_mask(mask, combined_out, "Cord+Canal (Labels 60+61)")
 
     except Exception as e:
@@ -94,9 +100,15 @@ if __name__ == "__main__":
     )
     parser.add_argument("-i", "--segmentation", required=True,
                         help="Input SPINEPS semantic segmentation file (_seg-spine.nii.gz).")
-    parser.add_argument("--cord", help="Output filename for Cord mask (Label 60)")
-    parser.add_argument("--canal", help="Output filename for Canal mask (Label 61)")
-    parser.add_argument("--combined", help="Output filename for Combined mask (Labels 60+61)")
+    parser.add_argument("--cord", help="Output filename for Cord mask (Label 60)"
+                        " (a .nii.gz path is written as .nii unless --compress is given)")
+    parser.add_argument("--canal", help="Output filename for Canal mask (Label 61)"
+                        " (a .nii.gz path is written as .nii unless --compress is given)")
+    parser.add_argument("--combined", help="Output filename for Combined mask (Labels 60+61)"
+                        " (a .nii.gz path is written as .nii unless --compress is given)")
+    parser.add_argument("--compress", action="store_true",
+                        help="Gzip the outputs (with pigz when installed). Without it, a .nii.gz "
+                             "output path is written uncompressed with the .gz dropped")
 
     args = parser.parse_args()
 
@@ -105,4 +117,5 @@ if __name__ == "__main__":
         cord_out=args.cord,
         canal_out=args.canal,
         combined_out=args.combined,
+        compress=args.compress,
     )
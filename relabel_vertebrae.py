@@ -3,15 +3,22 @@ import nibabel as nib
 import numpy as np
 import os
 
-def relabel_nifti(input_path, output_path):
+from nifti_io import save_nifti
+from seg_kernels import apply_lut
+
+def relabel_nifti(input_path, output_path, compress=False):
     print(f"Loading: {input_path}")
     
     # 1. Load the NIfTI file
     img = nib.load(input_path)
     
     # Get data as integer (labels are discrete integers)
-    # get_fdata() returns float64 by default, so we cast to int for safe comparison
-    data = img.get_fdata().astype(np.int32)
+    # Read the stored array via dataobj; only float-stored labels need rounding
+    # (in place, so float-stored labels cost one float and one int16 volume)
+    data = np.asanyarray(img.dataobj)
+    if not np.issubdtype(data.dtype, np.integer):
+        np.rint(data, out=data)
+    data = data.astype(np.int16, copy=False)
     
     # 2. Define the mapping (Old Label -> New Label)
     # Everything else will implicitly become 0 (background)
@@ -27,27 +34,28 @@ def relabel_nifti(input_path, output_path):
         50: 25,
     }
     
-    # 3. Create a new empty array of zeros with the same shape as the input
-    new_data = np.zeros_like(data)
+    # 3. Build a lookup table (old label index -> new label) covering every value in the image
+    lut_size = max(int(data.max()), max(label_mapping)) + 1
+    lut = np.zeros(lut_size, dtype=np.int16)
+    for old_label, new_label in label_mapping.items():
+        lut[old_label] = new_label
     
-    # 4. Perform the relabeling
+    # 4. Perform the relabeling in a single gather, and count all labels in one pass
     print("Relabeling...")
+    new_data, counts = apply_lut(data, lut)
     for old_label, new_label in label_mapping.items():
-        # Find where data equals the old label and assign the new label
-        mask = (data == old_label)
-        count = np.sum(mask)
+        count = counts[old_label]
         
         if count > 0:
-            new_data[mask] = new_label
             print(f"  - Mapped {old_label} -> {new_label} ({count} voxels)")
         else:
             print(f"  - Warning: Label {old_label} not found in image.")
 
     # 5. Save the result
     # We use the affine and header from the original image to preserve spatial info
-    new_img = nib.Nifti1Image(new_data.astype(np.int16), img.affine, img.header)
+    new_img = nib.Nifti1Image(new_data, img.affine, img.header)
     
-    nib.save(new_img, output_path)
+    output_path = save_nifti(new_img, output_path, compress)
     print(f"Saved relabeled file to: {output_path}")
 
 if __name__ == "__main__":
@@ -58,7 +66,10 @@ if __name__ == "__main__":
     parser.add_argument("--mask", type=str, required=True, help="Path to the input segmentation/label file (nii or nii.gz)")
     
     # Optional argument: --output (if not provided, appends _relabeled to filename)
-    parser.add_argument("--out", type=str, help="Path to save the output file. Defaults to input_relabeled.nii.gz")
+    parser.add_argument("--out", type=str, help="Path to save the output file. Defaults to input_relabeled with the input's extension; .nii.gz is written as .nii unless --compress")
+
+    # Optional argument: --compress (by default .nii.gz outputs are written uncompressed as .nii)
+    parser.add_argument("--compress", action="store_true", help="Gzip the output (with pigz when installed) instead of writing it uncompressed")
 
     args = parser.parse_args()
 
@@ -74,4 +85,4 @@ if __name__ == "__main__":
         else:
             out_path = f"{base}_relabeled{ext}"
 
-    relabel_nifti(args.mask, out_path)
+    relabel_nifti(args.mask, out_path, compress=args.compress)
@@ -0,0 +1,116 @@
+"""Shared label-volume kernels for the segmentation and label-processing scripts."""
+import numpy as np
+
+try:
+    from numba import get_num_threads, njit, prange
+except ImportError:  # numba is optional; fall back to plain numpy below
+    njit = None
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _split_labels_kernel(data, cord_label, canal_label,
+                             cord_mask, canal_mask, slices_with_cord, slices_with_canal):
+        """Write both binary masks and per-Z presence in a single pass over data.
+
+        Each axial slice is owned by one thread, so the presence flags need no atomics.
+        The x loop is innermost, which is contiguous for nibabel's Fortran-ordered arrays.
+        """
+        nx, ny, nz = data.shape
+        for z in prange(nz):
+            has_cord = False
+            has_canal = False
+            for y in range(ny):
+                for x in range(nx):
+                    v = data[x, y, z]
+                    if v == cord_label:
+                        cord_mask[x, y, z] = True
+                        has_cord = True
+                    elif v == canal_label:
+                        canal_mask[x, y, z] = True
+                        has_canal = True
+            slices_with_cord[z] = has_cord
+            slices_with_canal[z] = has_canal
+
+    @njit(parallel=True, cache=True)
+    def _relabel_kernel(data_flat, lut, out_flat, counts):
+        """Fused LUT gather + per-label count. counts has one row per thread chunk."""
+        n = data_flat.size
+        n_chunks = counts.shape[0]
+        chunk = (n + n_chunks - 1) // n_chunks
+        for c in prange(n_chunks):
+            for i in range(c * chunk, min((c + 1) * chunk, n)):
+                v = data_flat[i]
+                if 0 <= v < lut.size:
+                    out_flat[i] = lut[v]
+                    counts[c, v] += 1
+                else:
+                    out_flat[i] = 0
+
+
+def apply_lut(data, lut):
+    """Map every voxel of data through lut. Returns (new_data, counts per old label).
+
+    The output is allocated once; without numba, data is clipped in place.
+    """
+    # ravel(order="K") is a view for both C- and F-ordered volumes, so nothing
+    # below copies the volume
+    new_data = np.empty_like(data, dtype=lut.dtype)
+    if njit is None:
+        # Negative values have no mapping; send them to index 0 (background)
+        np.clip(data, 0, lut.size - 1, out=data)
+        np.take(lut, data, out=new_data, mode="clip")
+        return new_data, np.bincount(data.ravel(order="K"), minlength=lut.size)
+
+    counts = np.zeros((get_num_threads(), lut.size), dtype=np.int64)
+    _relabel_kernel(data.ravel(order="K"), lut, new_data.ravel(order="K"), counts)
+    return new_data, counts.sum(axis=0)
+
+
+def count_labels(data):
+    """Return (labels, voxel counts) for every value present in an integer label volume.
+
+    One O(N) bincount instead of sorting the volume with np.unique. bincount cannot
+    index negative values, so any (stray) negatives are counted separately.
+    """
+    flat = data.ravel(order="K")
+    if flat.min() >= 0:
+        counts = np.bincount(flat)
+        labels = np.flatnonzero(counts)
+        return labels, counts[labels]
+
+    negative = flat[flat < 0]
+    counts = np.bincount(flat.clip(min=0))
+    counts[0] -= negative.size  # clip pooled the negatives into the background bin
+    labels = np.flatnonzero(counts)
+    neg_labels, neg_counts = np.unique(negative, return_counts=True)
+    return (np.concatenate([neg_labels, labels]),
+            np.concatenate([neg_counts, counts[labels]]))
+
+
+def split_and_intersect(data, cord_label, canal_label):
+    """Split a 3D label volume into cord and canal masks restricted to their shared Z-range.
+
+    Returns (cord_mask, canal_mask, slices_with_cord, slices_with_canal). The Z-range
+    restriction is only applied when both labels are present; the per-slice presence
+    vectors describe the input before restriction.
+    """
+    if njit is None:
+        cord_mask = (data == cord_label)
+        canal_mask = (data == canal_label)
+        slices_with_cord = cord_mask.any(axis=(0, 1))
+        slices_with_canal = canal_mask.any(axis=(0, 1))
+    else:
+        cord_mask = np.zeros_like(data, dtype=bool)
+        canal_mask = np.zeros_like(data, dtype=bool)
+        slices_with_cord = np.zeros(data.shape[2], dtype=bool)
+        slices_with_canal = np.zeros(data.shape[2], dtype=bool)
+        _split_labels_kernel(data, cord_label, canal_label,
+                             cord_mask, canal_mask, slices_with_cord, slices_with_canal)
+
+    if slices_with_cord.any() and slices_with_canal.any():
+        # Only the slices outside the intersection are touched
+        invalid_z_slices = ~(slices_with_cord & slices_with_canal)
+        cord_mask[:, :, invalid_z_slices] = False
+        canal_mask[:, :, invalid_z_slices] = False
+    return cord_mask, canal_mask, slices_with_cord, slices_with_canal